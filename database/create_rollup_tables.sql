@@ -0,0 +1,71 @@
+-- Companion rollup tables for TrackingLog, populated by the *_rollup.sql
+-- scripts the importers write next to their INSERT scripts. Run a rollup
+-- script after its INSERT script: it recomputes the days/weeks the import
+-- touched from TrackingLog itself, so it only counts rows that landed and is
+-- safe to run again.
+-- Dashboard/analysis queries can read these instead of scanning TrackingLog,
+-- e.g. mean urgency for a day = UrgencySum / EventCount. PainLevel is NOT NULL
+-- in TrackingLog, so mean pain = PainLevelSum / EventCount as well.
+
+IF OBJECT_ID(N'[TrackingLogDailyRollup]', N'U') IS NULL
+BEGIN
+    CREATE TABLE [TrackingLogDailyRollup] (
+        [UserId] uniqueidentifier NOT NULL,
+        [EventDay] date NOT NULL,
+        [EventCount] int NOT NULL,
+        [AccidentCount] int NOT NULL,
+        [LeakAmountSum] int NOT NULL,
+        [LeakAmountMax] int NOT NULL,
+        [UrgencySum] int NOT NULL,
+        [UrgencyMax] int NOT NULL,
+        [PainLevelSum] int NOT NULL,
+        [PainLevelMax] int NOT NULL,
+        [AwokeFromSleepCount] int NOT NULL,
+        CONSTRAINT [PK_TrackingLogDailyRollup] PRIMARY KEY ([UserId], [EventDay])
+    );
+END;
+
+-- WeekStart is the Monday (ISO week start) of the week
+IF OBJECT_ID(N'[TrackingLogWeeklyRollup]', N'U') IS NULL
+BEGIN
+    CREATE TABLE [TrackingLogWeeklyRollup] (
+        [UserId] uniqueidentifier NOT NULL,
+        [WeekStart] date NOT NULL,
+        [EventCount] int NOT NULL,
+        [AccidentCount] int NOT NULL,
+        [LeakAmountSum] int NOT NULL,
+        [LeakAmountMax] int NOT NULL,
+        [UrgencySum] int NOT NULL,
+        [UrgencyMax] int NOT NULL,
+        [PainLevelSum] int NOT NULL,
+        [PainLevelMax] int NOT NULL,
+        [AwokeFromSleepCount] int NOT NULL,
+        CONSTRAINT [PK_TrackingLogWeeklyRollup] PRIMARY KEY ([UserId], [WeekStart])
+    );
+END;
+
+-- Rebuild both rollups from scratch (e.g. after rows were deleted by hand):
+-- TRUNCATE TABLE [TrackingLogDailyRollup];
+-- TRUNCATE TABLE [TrackingLogWeeklyRollup];
+-- INSERT INTO [TrackingLogDailyRollup]
+-- SELECT [UserId], CAST([EventDate] AS date), COUNT(*),
+--        SUM(CAST([Accident] AS int)), SUM([LeakAmount]), MAX([LeakAmount]),
+--        SUM([Urgency]), MAX([Urgency]), SUM([PainLevel]), MAX([PainLevel]),
+--        SUM(CAST([AwokeFromSleep] AS int))
+-- FROM [TrackingLog]
+-- GROUP BY [UserId], CAST([EventDate] AS date);
+--
+-- WeekStart must be the Monday of the week whatever DATEFIRST is set to;
+-- 1900-01-01 was a Monday, so count whole weeks from it.
+-- INSERT INTO [TrackingLogWeeklyRollup]
+-- SELECT [UserId],
+--        DATEADD(week, DATEDIFF(day, '19000101', CAST([EventDate] AS date)) / 7, CAST('19000101' AS date)),
+--        COUNT(*),
+--        SUM(CAST([Accident] AS int)), SUM([LeakAmount]), MAX([LeakAmount]),
+--        SUM([Urgency]), MAX([Urgency]), SUM([PainLevel]), MAX([PainLevel]),
+--        SUM(CAST([AwokeFromSleep] AS int))
+-- FROM [TrackingLog]
+-- GROUP BY [UserId],
+--          DATEADD(week, DATEDIFF(day, '19000101', CAST([EventDate] AS date)) / 7, CAST('19000101' AS date));
+
+-- EOF
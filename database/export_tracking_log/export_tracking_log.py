@@ -0,0 +1,339 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+from datetime import datetime
+
+import psycopg2
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    print("This script needs pyarrow: pip install pyarrow")
+    sys.exit(1)
+
+
+# Rows fetched from the server-side cursor per round trip
+FETCH_SIZE = 10000
+
+# Row count of every exported user/month partition, for --since-last-snapshot.
+# TrackingLog has no insert timestamp and most rows arrive through bulk imports
+# of old CSVs, so a date watermark would miss back-filled events. Comparing
+# per-partition counts catches inserts and deletes in any month; a partition
+# whose count changed is re-exported whole and its old files replaced.
+STATE_FILENAME = "_last_snapshot.json"
+
+SCHEMA = pa.schema(
+    [
+        ("Id", pa.string()),
+        ("UserId", pa.string()),
+        ("EventDate", pa.timestamp("us")),
+        ("Accident", pa.bool_()),
+        ("ChangePadOrUnderware", pa.bool_()),
+        ("LeakAmount", pa.int32()),
+        ("Urgency", pa.int32()),
+        ("AwokeFromSleep", pa.bool_()),
+        ("PainLevel", pa.int32()),
+        ("Notes", pa.string()),
+    ]
+)
+
+
+def connect_to_db():
+    # Same environment variables as read_onenote_make_insert_statements.py
+    conn_params = {
+        "dbname": os.getenv("PG_DATABASE"),
+        "user": os.getenv("PG_USER"),
+        "password": os.getenv("PG_PASSWORD"),
+        "host": os.getenv("PG_HOST", "localhost"),
+        "port": os.getenv("PG_PORT", "5432"),
+    }
+    return psycopg2.connect(**conn_params)
+
+
+def read_last_snapshot(output_dir):
+    """Return {"<UserId>/<YYYY-MM>": row count} from the previous snapshot, or None"""
+    state_path = os.path.join(output_dir, STATE_FILENAME)
+    if not os.path.exists(state_path):
+        return None
+
+    with open(state_path, "r", encoding="utf-8") as state_file:
+        state = json.load(state_file)
+
+    return {
+        tuple(key.split("/")): count for key, count in state["partitions"].items()
+    }
+
+
+def write_last_snapshot(output_dir, partition_counts, snapshot_id):
+    state_path = os.path.join(output_dir, STATE_FILENAME)
+    with open(state_path, "w", encoding="utf-8") as state_file:
+        json.dump(
+            {
+                "snapshot_id": snapshot_id,
+                "partitions": {
+                    f"{user_id}/{month}": count
+                    for (user_id, month), count in sorted(partition_counts.items())
+                },
+            },
+            state_file,
+            indent=2,
+        )
+
+
+def read_partition_counts(conn, user_id=None):
+    """Current row count of every user/month partition in TrackingLog"""
+    sql = (
+        'SELECT upper("UserId"::text), to_char("EventDate", \'YYYY-MM\'), count(*) '
+        'FROM public."TrackingLog"'
+    )
+    params = []
+    if user_id:
+        sql += ' WHERE "UserId" = %s'
+        params.append(user_id)
+    sql += " GROUP BY 1, 2"
+
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {(user, month): count for user, month, count in cursor.fetchall()}
+
+
+class PartitionWriter:
+    """
+    Writes rows into <output_dir>/UserId=<id>/month=<YYYY-MM>/part-<snapshot>.<ext>.
+
+    Rows arrive ordered by UserId, EventDate, so only one partition file is
+    open at a time and memory use stays at one fetch batch.
+    """
+
+    def __init__(self, output_dir, snapshot_id, file_format):
+        self.output_dir = output_dir
+        self.snapshot_id = snapshot_id
+        self.file_format = file_format
+        self.partition = None
+        self.writer = None
+        self.files_written = 0
+
+    def _open(self, partition):
+        partition_dir = _partition_dir(self.output_dir, partition)
+        os.makedirs(partition_dir, exist_ok=True)
+
+        if self.file_format == "parquet":
+            path = os.path.join(partition_dir, f"part-{self.snapshot_id}.parquet")
+            self.writer = pq.ParquetWriter(path, SCHEMA, compression="zstd")
+        else:
+            path = os.path.join(partition_dir, f"part-{self.snapshot_id}.arrow")
+            self.writer = pyarrow.ipc.new_file(path, SCHEMA)
+
+        self.partition = partition
+        self.files_written += 1
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.partition = None
+
+    def write_rows(self, partition, rows):
+        if partition != self.partition:
+            self.close()
+            self._open(partition)
+
+        columns = list(zip(*rows))
+        table = pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, SCHEMA)],
+            schema=SCHEMA,
+        )
+        self.writer.write_table(table)
+
+
+def export_tracking_log(output_dir, file_format="parquet", since_last_snapshot=False, user_id=None):
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+
+        previous_counts = read_last_snapshot(output_dir)
+        if since_last_snapshot:
+            if previous_counts is None and _holds_partitions(output_dir):
+                print(
+                    f"Error: '{output_dir}' holds exported files but no {STATE_FILENAME}. "
+                    "Export into an empty directory instead."
+                )
+                return False
+            print(
+                "Re-exporting user/month partitions whose row count changed. "
+                "Rows edited in place (same count) are not detected; "
+                "use a full export into an empty directory for those."
+            )
+        elif previous_counts is not None or _holds_partitions(output_dir):
+            print(
+                f"Error: '{output_dir}' already holds a snapshot. "
+                "Use --since-last-snapshot or an empty directory."
+            )
+            return False
+        previous_counts = previous_counts or {}
+
+        if user_id:
+            user_id = user_id.upper()
+
+        # Files are written to a per-snapshot temp directory and only moved
+        # into output_dir once the export has succeeded, so a failed run
+        # leaves nothing behind to be exported again by the next run.
+        # Creating it with exist_ok=False also guarantees the id is unique.
+        snapshot_id = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        temp_dir = os.path.join(output_dir, f".snapshot-{snapshot_id}.tmp")
+        os.makedirs(temp_dir, exist_ok=False)
+
+        writer = PartitionWriter(temp_dir, snapshot_id, file_format)
+        total_rows = 0
+
+        try:
+            conn = connect_to_db()
+            try:
+                # The counts and the rows must come from the same snapshot of
+                # the table, or rows inserted in between would be missed
+                conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+
+                current_counts = read_partition_counts(conn, user_id)
+                in_scope = {
+                    partition for partition in previous_counts
+                    if not user_id or partition[0] == user_id
+                }
+                changed = {
+                    partition for partition, count in current_counts.items()
+                    if previous_counts.get(partition) != count
+                }
+                removed = in_scope - set(current_counts)
+                print(f"{len(changed)} partition(s) to export, {len(removed)} to remove")
+
+                if changed:
+                    sql = (
+                        'SELECT "Id"::text, "UserId"::text, "EventDate", "Accident", '
+                        '"ChangePadOrUnderware", "LeakAmount", "Urgency", "AwokeFromSleep", '
+                        '"PainLevel", "Notes" '
+                        'FROM public."TrackingLog" '
+                        'WHERE (upper("UserId"::text), to_char("EventDate", \'YYYY-MM\')) IN %s '
+                        'ORDER BY "UserId", "EventDate"'
+                    )
+
+                    # A named cursor is a server-side cursor: rows are streamed in
+                    # FETCH_SIZE chunks instead of loading the whole table client side
+                    with conn.cursor(name="tracking_log_export") as cursor:
+                        cursor.execute(sql, [tuple(sorted(changed))])
+
+                        while True:
+                            rows = cursor.fetchmany(FETCH_SIZE)
+                            if not rows:
+                                break
+
+                            # Split the batch into runs that share a partition
+                            run_start = 0
+                            for i in range(1, len(rows) + 1):
+                                if i == len(rows) or _partition_of(rows[i]) != _partition_of(rows[run_start]):
+                                    writer.write_rows(_partition_of(rows[run_start]), rows[run_start:i])
+                                    run_start = i
+
+                            total_rows += len(rows)
+                            print(f"Exported {total_rows} rows...")
+            finally:
+                writer.close()
+                conn.close()
+
+            _move_snapshot_into_place(temp_dir, output_dir, changed | removed)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        new_counts = {
+            partition: count for partition, count in previous_counts.items()
+            if partition not in removed
+        }
+        new_counts.update(current_counts)
+        write_last_snapshot(output_dir, new_counts, snapshot_id)
+
+        print(
+            f"Snapshot {snapshot_id} complete: {total_rows} rows "
+            f"in {writer.files_written} file(s)"
+        )
+        return True
+
+    except PermissionError:
+        print(f"Error: Permission denied writing to '{output_dir}'")
+        return False
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        return False
+
+
+def _holds_partitions(output_dir):
+    return any(name.startswith("UserId=") for name in os.listdir(output_dir))
+
+
+def _partition_dir(output_dir, partition):
+    user_id, month = partition
+    return os.path.join(output_dir, f"UserId={user_id}", f"month={month}")
+
+
+def _move_snapshot_into_place(temp_dir, output_dir, replaced_partitions):
+    """
+    Move the new part files into output_dir, then delete the older files of
+    every partition that was re-exported or no longer exists.
+    """
+    moves = []
+    for dirpath, _, filenames in os.walk(temp_dir):
+        relative_dir = os.path.relpath(dirpath, temp_dir)
+        target_dir = os.path.normpath(os.path.join(output_dir, relative_dir))
+        for filename in filenames:
+            moves.append((os.path.join(dirpath, filename), os.path.join(target_dir, filename)))
+
+    # Check everything first so a clash doesn't leave half a snapshot behind
+    for _, target in moves:
+        if os.path.exists(target):
+            raise FileExistsError(f"'{target}' already exists")
+
+    for source, target in moves:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source, target)
+
+    new_files = {target for _, target in moves}
+    for partition in replaced_partitions:
+        partition_dir = _partition_dir(output_dir, partition)
+        if not os.path.isdir(partition_dir):
+            continue
+        for filename in os.listdir(partition_dir):
+            path = os.path.normpath(os.path.join(partition_dir, filename))
+            if path not in new_files:
+                os.remove(path)
+        if not os.listdir(partition_dir):
+            os.rmdir(partition_dir)
+
+
+def _partition_of(row):
+    return row[1].upper(), row[2].strftime("%Y-%m")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export TrackingLog to Parquet/Arrow files partitioned by user and month"
+    )
+    parser.add_argument("output_dir")
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument(
+        "--since-last-snapshot",
+        action="store_true",
+        help="re-export only the user/month partitions whose row count changed since "
+        "the previous snapshot in output_dir (picks up back-filled imports; rows "
+        "edited in place need a full export into an empty directory)",
+    )
+    parser.add_argument("--user-id", help="only export this user's events")
+    args = parser.parse_args()
+
+    success = export_tracking_log(
+        args.output_dir, args.format, args.since_last_snapshot, args.user_id
+    )
+
+    if success:
+        print("Done.")
+    else:
+        sys.exit(1)
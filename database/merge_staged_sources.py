@@ -0,0 +1,184 @@
+import argparse
+import sys
+from collections import deque
+from datetime import timedelta
+
+from tracking_log_staging import StagingFile, StagingWriter
+
+
+# Lower index wins when the same event was logged in several tools
+DEFAULT_PRECEDENCE = ["tally", "jotform", "onenote"]
+
+# Events from different sources this close together are treated as one event
+DEFAULT_WINDOW_MINUTES = 2
+
+# Columns that may be NULL in the winning record and filled from a duplicate
+FILLABLE_COLUMNS = ["PainLevel", "Notes"]
+
+
+def parse_user_map(mappings):
+    """Parse SOURCE_USER_ID=TARGET_USER_ID strings into a dict"""
+    user_map = {}
+    for mapping in mappings or []:
+        source_id, _, target_id = mapping.partition("=")
+        if not target_id:
+            raise ValueError(f"Invalid --map-user '{mapping}', expected SOURCE_ID=TARGET_ID")
+        user_map[source_id.strip().upper()] = target_id.strip().upper()
+    return user_map
+
+
+def load_staged_records(staging_filenames, precedence, user_map=None):
+    """
+    Load every record from the staging files, tagged with its source's rank.
+
+    Records are only compared within one UserId, and the importers don't all
+    use the same id for the same person (Tally's is 91A77400..., Jotform's
+    and OneNote's 688E6E82...). user_map rewrites UserIds as they are loaded
+    so those sources can be merged with each other.
+
+    Returns a list of (UserId, EventDate, rank, record) tuples.
+    """
+    user_map = user_map or {}
+    events = []
+
+    for filename in staging_filenames:
+        with StagingFile(filename) as staging:
+            if staging.source not in precedence:
+                raise ValueError(
+                    f"'{filename}' is from source '{staging.source}', "
+                    f"which is not in the precedence list {precedence}"
+                )
+            rank = precedence.index(staging.source)
+            print(f"Loading {len(staging)} records from '{filename}' ({staging.source})")
+
+            for record in staging:
+                record["UserId"] = user_map.get(record["UserId"], record["UserId"])
+                events.append((record["UserId"], record["EventDate"], rank, record))
+
+    return events
+
+
+def find_duplicate_groups(events, window):
+    """
+    Group events that are the same real-world event logged in different tools.
+
+    Events are sorted by user and time (O(n log n)) and swept once, keeping
+    every group that started within `window` of the current event open. An
+    event joins the open group closest to it in time that doesn't already
+    have an event from its source (the earliest one on a tie), otherwise it
+    starts a new group. Two events from the same tool are never merged, since
+    one tool can't log the same event twice.
+    """
+    events.sort(key=lambda event: (event[0], event[1], event[2]))
+
+    open_groups = deque()
+    current_user = None
+
+    for event in events:
+        user_id, event_date, rank, _ = event
+
+        if user_id != current_user:
+            while open_groups:
+                yield open_groups.popleft()[0]
+            current_user = user_id
+
+        # Groups are opened in time order, so the oldest ones close first
+        while open_groups and event_date - open_groups[0][0][0][1] > window:
+            yield open_groups.popleft()[0]
+
+        best = None
+        for group, ranks in open_groups:
+            if rank in ranks:
+                continue
+            distance = event_date - group[0][1]
+            if best is None or distance < best[0]:
+                best = (distance, group, ranks)
+
+        if best:
+            best[1].append(event)
+            best[2].add(rank)
+        else:
+            open_groups.append(([event], {rank}))
+
+    while open_groups:
+        yield open_groups.popleft()[0]
+
+
+def reconcile(group):
+    """Pick the highest-precedence record, filling its NULLs from the others"""
+    by_precedence = sorted(group, key=lambda event: event[2])
+    merged = dict(by_precedence[0][3])
+
+    for column in FILLABLE_COLUMNS:
+        if merged[column] is not None:
+            continue
+        for _, _, _, record in by_precedence[1:]:
+            if record[column] is not None:
+                merged[column] = record[column]
+                break
+
+    return merged
+
+
+def merge_staged_sources(staging_filenames, output_filename, precedence, window_minutes, user_map=None):
+    try:
+        events = load_staged_records(staging_filenames, precedence, user_map)
+        window = timedelta(minutes=window_minutes)
+
+        merged_count = 0
+        with StagingWriter(output_filename, "merged") as writer:
+            for group in find_duplicate_groups(events, window):
+                writer.add(reconcile(group))
+                merged_count += 1
+
+        print(
+            f"Merged {len(events)} records into {merged_count} "
+            f"({len(events) - merged_count} duplicates removed), wrote {output_filename}"
+        )
+        return True
+
+    except FileNotFoundError as e:
+        print(f"Error: The file '{e.filename}' was not found.")
+        return False
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Merge staging files from several sources, dropping cross-source duplicates"
+    )
+    parser.add_argument("staging_files", nargs="+")
+    parser.add_argument("-o", "--output", default="merged.bts")
+    parser.add_argument(
+        "--precedence",
+        default=",".join(DEFAULT_PRECEDENCE),
+        help="comma separated sources, most trusted first (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--window-minutes",
+        type=float,
+        default=DEFAULT_WINDOW_MINUTES,
+        help="max minutes between duplicates of one event (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--map-user",
+        action="append",
+        metavar="SOURCE_ID=TARGET_ID",
+        help="treat SOURCE_ID as TARGET_ID, e.g. to merge Tally's user with Jotform's (repeatable)",
+    )
+    args = parser.parse_args()
+
+    precedence = [source.strip() for source in args.precedence.split(",") if source.strip()]
+
+    try:
+        user_map = parse_user_map(args.map_user)
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+    if merge_staged_sources(args.staging_files, args.output, precedence, args.window_minutes, user_map):
+        print("Done.")
+    else:
+        sys.exit(1)
@@ -1,8 +1,15 @@
+import os
 import sys
+import contextlib
 import csv
 import uuid
 from datetime import datetime
 
+# Shared import helpers live one level up, next to the importer folders
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from tracking_log_rollup import TrackingLogRollup, rollup_output_filename  # noqa: E402
+from tracking_log_staging import StagingWriter  # noqa: E402
+
 
 def parse_jotform_datetime(date_str):
     """Parse Jotform datetime format 'Mar 6, 2025 03:46 PM' to datetime object"""
@@ -54,13 +61,17 @@ def write_batch(outfile, rows):
     outfile.write(";\n\n")
 
 
-def process_jotform_csv(input_filename):
+def process_jotform_csv(input_filename, staging_filename=None):
     """Process Jotform CSV and convert to SQL Server format"""
     try:
         USER_ID = "688E6E82-75F3-451F-8A0B-40176C70F7F8"
+        output_filename = "Jotform_data_for_input.sql"
+        rollup = TrackingLogRollup()
         
         with open(input_filename, 'r', newline='', encoding='utf-8') as infile, \
-             open("Jotform_data_for_input.sql", "w", encoding='utf-8') as outfile:
+             open(output_filename, "w", encoding='utf-8') as outfile, \
+             (StagingWriter(staging_filename, "jotform") if staging_filename
+              else contextlib.nullcontext()) as staging:
             
             print("File opened successfully.")
             
@@ -116,8 +127,25 @@ def process_jotform_csv(input_filename):
                             f"{pain_level}, " \
                             f"{notes_value})"
                     
+                    # Stage first: if it fails the row is skipped everywhere
+                    if staging:
+                        staging.add({
+                            "Id": record_id,
+                            "UserId": USER_ID,
+                            "EventDate": event_date,
+                            "Accident": accident,
+                            "ChangePadOrUnderware": change_pad,
+                            "LeakAmount": leak_amount,
+                            "Urgency": urgency,
+                            "AwokeFromSleep": awoke_from_sleep,
+                            # Blank stays NULL so a merge can fill it from another source
+                            "PainLevel": safe_int(row.get("Pain level, if any", ""), None),
+                            "Notes": notes or None,
+                        })
+                    
                     rows.append(values)
                     processed_count += 1
+                    rollup.add(USER_ID, event_date)
                     
                     # Write batch when we reach batch_size
                     if len(rows) >= batch_size:
@@ -133,6 +161,7 @@ def process_jotform_csv(input_filename):
             if rows:
                 write_batch(outfile, rows)
             
+            rollup.write_upsert_script(rollup_output_filename(output_filename))
             print(f"SQL file generated successfully. Processed {processed_count} total rows.")
             return True
     
@@ -150,11 +179,12 @@ def process_jotform_csv(input_filename):
 # Main execution
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python import_jotform_csv.py <input_filename>")
+        print("Usage: python import_jotform_csv.py <input_filename> [staging_file]")
         sys.exit(1)
     
     input_filename = sys.argv[1]
-    success = process_jotform_csv(input_filename)
+    staging_filename = sys.argv[2] if len(sys.argv) > 2 else None
+    success = process_jotform_csv(input_filename, staging_filename)
     
     if success:
         print("Done.")
@@ -0,0 +1,151 @@
+import os
+import sys
+import uuid
+import asyncio
+from datetime import datetime
+
+import asyncpg
+
+
+# Max concurrent connections (and so concurrent page writes) unless overridden
+DEFAULT_POOL_SIZE = 4
+
+COLUMNS = [
+    "Id",
+    "EventDate",
+    "Accident",
+    "ChangePadOrUnderware",
+    "LeakAmount",
+    "Urgency",
+    "AwokeFromSleep",
+    "PainLevel",
+    "Notes",
+    "UserId",
+]
+
+INSERT_SQL = f"""
+    INSERT INTO public."TrackingLog" ({', '.join(f'"{col}"' for col in COLUMNS)})
+    VALUES ({', '.join(f'${i + 1}' for i in range(len(COLUMNS)))})
+    """
+
+
+def _to_row(entry):
+    """Convert a parse_page_content entry to the Python types asyncpg expects"""
+    event_date = entry["EventDate"]
+    if isinstance(event_date, str):
+        event_date = datetime.strptime(event_date, "%Y-%m-%d %H:%M")
+
+    row = dict(entry, EventDate=event_date)
+    row["Id"] = uuid.UUID(str(row["Id"]))
+    row["UserId"] = uuid.UUID(str(row["UserId"]))
+    return tuple(row[col] for col in COLUMNS)
+
+
+class AsyncTrackingLogWriter:
+    """
+    Pooled asyncpg writer for TrackingLog entries.
+
+    Every write_entries() call takes its own connection from the pool and runs
+    in its own transaction, so several pages can be written at once without
+    blocking the event loop, and a failing page rolls back on its own.
+    """
+
+    def __init__(self, pool_size=None):
+        self.pool_size = pool_size or int(os.getenv("PG_POOL_SIZE", DEFAULT_POOL_SIZE))
+        self.pool = None
+
+    async def open(self):
+        # Same environment variables the psycopg2 connection used
+        self.pool = await asyncpg.create_pool(
+            database=os.getenv("PG_DATABASE"),
+            user=os.getenv("PG_USER"),
+            password=os.getenv("PG_PASSWORD"),
+            host=os.getenv("PG_HOST", "localhost"),
+            port=int(os.getenv("PG_PORT", "5432")),
+            min_size=1,
+            max_size=self.pool_size,
+        )
+        return self
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def write_entries(self, entries):
+        """Insert a batch of entries (e.g. one page) in a single transaction"""
+        if not entries:
+            return 0
+
+        rows = [_to_row(entry) for entry in entries]
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(INSERT_SQL, rows)
+
+        return len(rows)
+
+
+async def check_writer(user_id, pages=8, entries_per_page=25):
+    """
+    Write fake pages concurrently through write_entries(), check they all
+    landed, then delete them again.
+
+    Run against a local Postgres container, e.g.
+        docker run --rm -e POSTGRES_PASSWORD=postgres -p 5432:5432 postgres
+    with the TrackingLog schema applied and user_id present in "Users".
+    """
+    # Unique per run, so the cleanup only ever touches this check's rows
+    marker = f"async writer check {uuid.uuid4()}"
+
+    async with AsyncTrackingLogWriter() as writer:
+
+        async def write_page(page_num):
+            entries = [
+                {
+                    "Id": str(uuid.uuid4()),
+                    "EventDate": datetime(2000, 1, 1, page_num % 24, i % 60),
+                    "Accident": False,
+                    "ChangePadOrUnderware": False,
+                    "LeakAmount": 1,
+                    "Urgency": 1,
+                    "AwokeFromSleep": False,
+                    "PainLevel": 1,
+                    "Notes": marker,
+                    "UserId": user_id,
+                }
+                for i in range(entries_per_page)
+            ]
+            written = await writer.write_entries(entries)
+            print(f"Page {page_num}: wrote {written} rows")
+
+        try:
+            await asyncio.gather(*(write_page(page_num) for page_num in range(pages)))
+
+            async with writer.pool.acquire() as conn:
+                count = await conn.fetchval(
+                    'SELECT count(*) FROM public."TrackingLog" WHERE "Notes" = $1', marker
+                )
+
+            expected = pages * entries_per_page
+            if count != expected:
+                raise Exception(f"Expected {expected} rows, found {count}")
+
+            print(f"Wrote {count} rows in {pages} concurrent pages using a pool of {writer.pool_size}")
+        finally:
+            async with writer.pool.acquire() as conn:
+                await conn.execute('DELETE FROM public."TrackingLog" WHERE "Notes" = $1', marker)
+            print("Removed the check's rows")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python async_tracking_log_writer.py <existing_user_id>")
+        sys.exit(1)
+
+    asyncio.run(check_writer(sys.argv[1]))
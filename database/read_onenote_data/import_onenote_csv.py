@@ -1,7 +1,14 @@
+import os
 import sys
+import contextlib
 import uuid
 from datetime import datetime, timedelta
 
+# Shared import helpers live one level up, next to the importer folders
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from tracking_log_rollup import TrackingLogRollup, rollup_output_filename  # noqa: E402
+from tracking_log_staging import StagingWriter  # noqa: E402
+
 
 def urgency_to_int(text):
     try:
@@ -66,11 +73,15 @@ def write_batch(outfile, rows):
     outfile.write(";\n\n")
 
 
-def start_parsing_datafile(input_filename):
+def start_parsing_datafile(input_filename, staging_filename=None):
     try:
         USER_ID = "688E6E82-75F3-451F-8A0B-40176C70F7F8"
+        output_filename = "OneNote_data_for_input.sql"
+        rollup = TrackingLogRollup()
         
-        with open(input_filename, "r") as infile, open("OneNote_data_for_input.sql", "w") as outfile:
+        with open(input_filename, "r") as infile, open(output_filename, "w") as outfile, \
+             (StagingWriter(staging_filename, "onenote") if staging_filename
+              else contextlib.nullcontext()) as staging:
             print("File opened successfully.")
             
             current_date = None
@@ -112,6 +123,8 @@ def start_parsing_datafile(input_filename):
 
                 # Generate UUID for Id column
                 record_id = str(uuid.uuid4()).upper()
+                urgency_value = urgency_to_int(urgency) if urgency else 1
+                pain_value = pain_level if pain_level else 0
                 
                 values = f"('{record_id}', " \
                         f"'{USER_ID}', " \
@@ -119,12 +132,28 @@ def start_parsing_datafile(input_filename):
                         f"0, " \
                         f"0, " \
                         f"0, " \
-                        f"{urgency_to_int(urgency) if urgency else 1}, " \
+                        f"{urgency_value}, " \
                         f"{1 if sleeping else 0}, " \
-                        f"{pain_level if pain_level else 0}, " \
+                        f"{pain_value}, " \
                         f"{notes_value})"
                 
+                if staging:
+                    staging.add({
+                        "Id": record_id,
+                        "UserId": USER_ID,
+                        "EventDate": full_datetime,
+                        "Accident": False,
+                        "ChangePadOrUnderware": False,
+                        "LeakAmount": 0,
+                        "Urgency": urgency_value,
+                        "AwokeFromSleep": sleeping,
+                        # Blank stays NULL so a merge can fill it from another source
+                        "PainLevel": pain_level,
+                        "Notes": notes or None,
+                    })
+                
                 rows.append(values)
+                rollup.add(USER_ID, full_datetime)
                 
                 # Write batch when we reach batch_size
                 if len(rows) >= batch_size:
@@ -135,6 +164,7 @@ def start_parsing_datafile(input_filename):
             if rows:
                 write_batch(outfile, rows)
             
+            rollup.write_upsert_script(rollup_output_filename(output_filename))
             print("SQL file generated successfully.")
             return True
     
@@ -151,11 +181,12 @@ def start_parsing_datafile(input_filename):
 # Main execution
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python script.py <input_filename>")
+        print("Usage: python script.py <input_filename> [staging_file]")
         sys.exit(1)
     
     input_filename = sys.argv[1]
-    success = start_parsing_datafile(input_filename)
+    staging_filename = sys.argv[2] if len(sys.argv) > 2 else None
+    success = start_parsing_datafile(input_filename, staging_filename)
     
     if success:
         print("Done.")
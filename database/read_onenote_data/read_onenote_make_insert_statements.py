@@ -3,10 +3,15 @@ import uuid
 import re
 from datetime import datetime
 import asyncio
-import psycopg2
 import requests
 import msal
 
+from async_tracking_log_writer import AsyncTrackingLogWriter
+
+
+# Max concurrent page downloads from Graph unless GRAPH_FETCH_CONCURRENCY is set
+DEFAULT_FETCH_CONCURRENCY = 8
+
 
 class OneNoteExtractor:
     def __init__(self):
@@ -19,9 +24,14 @@ class OneNoteExtractor:
 
         self.graph_url = "https://graph.microsoft.com/v1.0"
         self.user_id = None
-        self.db_conn = None
+        self.writer = None
         self.access_token = None
 
+        # Fetches have their own limit; writes are bounded by the writer's pool
+        self.fetch_limit = asyncio.Semaphore(
+            int(os.getenv("GRAPH_FETCH_CONCURRENCY", DEFAULT_FETCH_CONCURRENCY))
+        )
+
         # Create an MSAL app
         # Update the authority to include 'common' for multi-tenant apps
         self.app = msal.PublicClientApplication(
@@ -62,27 +72,31 @@ class OneNoteExtractor:
             "Content-Type": "application/json",
         }
 
-        response = requests.get(f"{self.graph_url}{endpoint}", headers=headers)
+        # requests is blocking, so run it off the event loop; that lets page
+        # fetches overlap with database writes
+        response = await asyncio.to_thread(
+            requests.get, f"{self.graph_url}{endpoint}", headers=headers
+        )
 
         # Handle token expiration
         if response.status_code == 401:
             # Refresh token and retry
             await self.get_token()
             headers["Authorization"] = f"Bearer {self.access_token}"
-            response = requests.get(f"{self.graph_url}{endpoint}", headers=headers)
+            response = await asyncio.to_thread(
+                requests.get, f"{self.graph_url}{endpoint}", headers=headers
+            )
 
         return response
 
-    def connect_to_db(self):
-        # Get connection details from environment variables
-        conn_params = {
-            "dbname": os.getenv("PG_DATABASE"),
-            "user": os.getenv("PG_USER"),
-            "password": os.getenv("PG_PASSWORD"),
-            "host": os.getenv("PG_HOST", "localhost"),
-            "port": os.getenv("PG_PORT", "5432"),
-        }
-        self.db_conn = psycopg2.connect(**conn_params)
+    async def connect_to_db(self, pool_size=None):
+        # Connection details come from the PG_* environment variables,
+        # pool size from PG_POOL_SIZE unless given
+        self.writer = await AsyncTrackingLogWriter(pool_size).open()
+
+    async def close_db(self):
+        if self.writer:
+            await self.writer.close()
 
     async def get_notebooks(self):
         response = await self.make_graph_request("/me/onenote/notebooks")
@@ -168,16 +182,21 @@ class OneNoteExtractor:
 
         return entries
 
-    def generate_insert_statement(self, entry):
-        columns = entry.keys()
-        values = [entry[col] for col in columns]
-        placeholders = [f"%s" for _ in values]
+    async def process_page(self, page):
+        try:
+            event_date = datetime.strptime(page["title"], "%Y-%m-%d").date()
+            async with self.fetch_limit:
+                content = await self.get_page_content(page["id"])
+
+            entries = self.parse_page_content(content, event_date)
+            print(f"Processing page {page['title']} - found {len(entries)} entries")
+
+            # One transaction per page; a failure only rolls back this page
+            await self.writer.write_entries(entries)
+            print(f"Successfully imported data from {page['title']}")
 
-        sql = f"""
-        INSERT INTO public."TrackingLog" ({', '.join(f'"{col}"' for col in columns)})
-        VALUES ({', '.join(placeholders)})
-        """
-        return sql, values
+        except Exception as e:
+            print(f"Error processing page {page['title']}: {str(e)}")
 
     async def process_notebook(self):
         notebooks = await self.get_notebooks()
@@ -204,34 +223,19 @@ class OneNoteExtractor:
             raise ValueError("Invalid UUID format")
 
         pages = await self.get_pages(selected_section["id"])
-        cursor = self.db_conn.cursor()
-
-        for page in pages:
-            try:
-                event_date = datetime.strptime(page["title"], "%Y-%m-%d").date()
-                content = await self.get_page_content(page["id"])
-
-                entries = self.parse_page_content(content, event_date)
-                print(f"Processing page {page['title']} - found {len(entries)} entries")
-
-                for entry in entries:
-                    sql, values = self.generate_insert_statement(entry)
-                    cursor.execute(sql, values)
-
-                self.db_conn.commit()
-                print(f"Successfully imported data from {page['title']}")
-
-            except Exception as e:
-                self.db_conn.rollback()
-                print(f"Error processing page {page['title']}: {str(e)}")
 
-        cursor.close()
+        # Downloads are limited by fetch_limit, and write_entries waits for a
+        # free pooled connection, so a slow fetch never holds up a write
+        await asyncio.gather(*(self.process_page(page) for page in pages))
 
 
 async def main():
     extractor = OneNoteExtractor()
-    extractor.connect_to_db()
-    await extractor.process_notebook()
+    await extractor.connect_to_db()
+    try:
+        await extractor.process_notebook()
+    finally:
+        await extractor.close_db()
 
 
 if __name__ == "__main__":
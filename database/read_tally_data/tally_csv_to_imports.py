@@ -1,7 +1,13 @@
+import os
 import csv
 import sys
 import datetime
 
+# Shared import helpers live one level up, next to the importer folders
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from tracking_log_rollup import TrackingLogRollup, rollup_output_filename  # noqa: E402
+from tracking_log_staging import StagingWriter  # noqa: E402
+
 
 def urgency_to_int(text):
     urgency_map = {
@@ -51,7 +57,7 @@ def format_datetime(date_str, time_str):
 
 # The UUID for the user
 # USER_ID = "91A77400-564E-4312-8DB5-BCD869A786CE"
-def start_parsing_datafile(input_file):
+def start_parsing_datafile(input_file, staging_filename=None):
     try:
         # The UUID for the user
         USER_ID = "91A77400-564E-4312-8DB5-BCD869A786CE"
@@ -73,6 +79,12 @@ def start_parsing_datafile(input_file):
 
         print(f"Total rows: {total_rows}, will create {total_files} file(s)")
 
+        # Days/weeks touched by the rows we write, for the rollup tables
+        rollup = TrackingLogRollup()
+
+        # Normalized records for the optional staging file
+        staged_records = []
+
         # Process rows in batches
         for file_num in range(total_files):
             start_row = file_num * MAX_ROWS_PER_FILE
@@ -161,10 +173,42 @@ def start_parsing_datafile(input_file):
                     outfile.write(values)
                     rows_in_file += 1
 
+                    event_datetime = datetime.datetime.strptime(
+                        formatted_datetime, "%Y-%m-%d %H:%M:%S"
+                    )
+                    rollup.add(USER_ID, event_datetime)
+
+                    if staging_filename:
+                        staged_records.append(
+                            {
+                                "UserId": USER_ID,
+                                "EventDate": event_datetime,
+                                "Accident": accident,
+                                "ChangePadOrUnderware": change_pad,
+                                "LeakAmount": leak_amount,
+                                "Urgency": urgency,
+                                "AwokeFromSleep": awoke_from_sleep,
+                                "PainLevel": pain_level,
+                                "Notes": notes or None,
+                            }
+                        )
+
                 # End the statement
                 outfile.write(";\n")
                 print(f"Created {output_file} with {rows_in_file} rows")
 
+        rollup.write_upsert_script(
+            rollup_output_filename(input_file.rsplit(".", 1)[0] + "_output.sql")
+        )
+
+        # Any failure here removes the staging file and fails the import,
+        # so it never silently holds fewer rows than the SQL files
+        if staging_filename:
+            with StagingWriter(staging_filename, "tally") as staging:
+                for record in staged_records:
+                    staging.add(record)
+            print(f"Created {staging_filename} with {len(staged_records)} records")
+
         print(f"All SQL files generated successfully!")
 
     except FileNotFoundError:
@@ -182,11 +226,12 @@ def start_parsing_datafile(input_file):
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python script.py <input_csv_file>")
+        print("Usage: python script.py <input_csv_file> [staging_file]")
         sys.exit(1)
 
     input_file = sys.argv[1]
-    if start_parsing_datafile(input_file):
+    staging_filename = sys.argv[2] if len(sys.argv) > 2 else None
+    if start_parsing_datafile(input_file, staging_filename):
         print("Processing completed successfully.")
     else:
         print("Processing failed.")
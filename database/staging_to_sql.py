@@ -0,0 +1,105 @@
+import sys
+
+from tracking_log_rollup import TrackingLogRollup, rollup_output_filename
+from tracking_log_staging import StagingFile
+
+
+def format_values(record):
+    """Format a staged record as a SQL Server VALUES row"""
+    notes = record["Notes"]
+    if notes:
+        escaped_notes = notes.replace("'", "''")
+        notes_value = f"'{escaped_notes}'"
+    else:
+        notes_value = 'NULL'
+
+    # Tally imports leave the Id to the database
+    record_id = f"'{record['Id']}'" if record["Id"] else "NEWID()"
+
+    # PainLevel is NOT NULL; a missing level is written as 0, like the
+    # Jotform/OneNote importers do
+    pain_level = record["PainLevel"] if record["PainLevel"] is not None else 0
+
+    return f"({record_id}, " \
+           f"'{record['UserId']}', " \
+           f"'{record['EventDate'].strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]}', " \
+           f"{1 if record['Accident'] else 0}, " \
+           f"{1 if record['ChangePadOrUnderware'] else 0}, " \
+           f"{record['LeakAmount']}, " \
+           f"{record['Urgency']}, " \
+           f"{1 if record['AwokeFromSleep'] else 0}, " \
+           f"{pain_level}, " \
+           f"{notes_value})"
+
+
+def write_batch(outfile, rows):
+    """Write a batch of rows to the output file"""
+    outfile.write(
+        """INSERT INTO [TrackingLog] (
+        [Id],
+        [UserId],
+        [EventDate],
+        [Accident],
+        [ChangePadOrUnderware],
+        [LeakAmount],
+        [Urgency],
+        [AwokeFromSleep],
+        [PainLevel],
+        [Notes]
+      ) VALUES\n"""
+    )
+
+    for i, row in enumerate(rows):
+        if i > 0:
+            outfile.write(",\n")
+        outfile.write(row)
+
+    outfile.write(";\n\n")
+
+
+def staging_to_sql(staging_filename):
+    """Write INSERT (and rollup) scripts straight from a staging file, no parsing"""
+    try:
+        output_filename = staging_filename.rsplit(".", 1)[0] + "_staged.sql"
+        rollup = TrackingLogRollup()
+
+        with StagingFile(staging_filename) as staging, \
+             open(output_filename, "w", encoding="utf-8") as outfile:
+
+            print(f"Loading {len(staging)} records staged from '{staging.source}'...")
+
+            rows = []
+            batch_size = 1000
+
+            for record in staging:
+                rows.append(format_values(record))
+                rollup.add(record["UserId"], record["EventDate"])
+
+                if len(rows) >= batch_size:
+                    write_batch(outfile, rows)
+                    rows = []
+
+            if rows:
+                write_batch(outfile, rows)
+
+        rollup.write_upsert_script(rollup_output_filename(output_filename))
+        print(f"Created {output_filename}")
+        return True
+
+    except FileNotFoundError:
+        print(f"Error: The file '{staging_filename}' was not found.")
+        return False
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        return False
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python staging_to_sql.py <staging_file>")
+        sys.exit(1)
+
+    if staging_to_sql(sys.argv[1]):
+        print("Done.")
+    else:
+        sys.exit(1)
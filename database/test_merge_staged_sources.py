@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+from merge_staged_sources import find_duplicate_groups, merge_staged_sources, reconcile
+from tracking_log_staging import StagingFile, StagingWriter
+
+
+USER_ID = "688E6E82-75F3-451F-8A0B-40176C70F7F8"
+TALLY_USER_ID = "91A77400-564E-4312-8DB5-BCD869A786CE"
+WINDOW = timedelta(minutes=2)
+
+JOTFORM, ONENOTE = 1, 2
+
+
+def make_record(name, hour, minute, user_id=USER_ID, pain_level=1, notes=None):
+    return {
+        "UserId": user_id,
+        "EventDate": datetime(2025, 3, 1, hour, minute),
+        "Accident": False,
+        "ChangePadOrUnderware": False,
+        "LeakAmount": 1,
+        "Urgency": 1,
+        "AwokeFromSleep": False,
+        "PainLevel": pain_level,
+        "Notes": notes if notes is not None else name,
+    }
+
+
+def make_event(name, rank, hour, minute, **kwargs):
+    record = make_record(name, hour, minute, **kwargs)
+    return (record["UserId"], record["EventDate"], rank, record)
+
+
+def group_names(groups):
+    return [[event[3]["Notes"] for event in group] for group in groups]
+
+
+def test_same_source_events_in_one_window_pair_up():
+    events = [
+        make_event("J1", JOTFORM, 10, 0),
+        make_event("J2", JOTFORM, 10, 0),
+        make_event("O1", ONENOTE, 10, 0),
+        make_event("O2", ONENOTE, 10, 0),
+    ]
+
+    assert group_names(find_duplicate_groups(events, WINDOW)) == [["J1", "O1"], ["J2", "O2"]]
+
+
+def test_event_joins_nearest_open_group():
+    events = [
+        make_event("J1", JOTFORM, 10, 0),
+        make_event("J2", JOTFORM, 10, 1),
+        make_event("O1", ONENOTE, 10, 1),
+        make_event("O2", ONENOTE, 10, 2),
+    ]
+
+    assert group_names(find_duplicate_groups(events, WINDOW)) == [["J1", "O2"], ["J2", "O1"]]
+
+
+def test_events_outside_window_or_for_other_users_stay_separate():
+    events = [
+        make_event("J1", JOTFORM, 10, 0),
+        make_event("O1", ONENOTE, 10, 3),
+        make_event("J2", JOTFORM, 11, 0),
+        make_event("O2", ONENOTE, 11, 0, user_id=TALLY_USER_ID),
+    ]
+
+    groups = group_names(find_duplicate_groups(events, WINDOW))
+
+    assert sorted(groups) == [["J1"], ["J2"], ["O1"], ["O2"]]
+
+
+def test_reconcile_prefers_precedence_and_fills_nulls():
+    group = [
+        make_event("onenote", ONENOTE, 10, 0, pain_level=4),
+        make_event("jotform", JOTFORM, 10, 1, pain_level=None),
+    ]
+
+    merged = reconcile(group)
+
+    assert merged["Notes"] == "jotform"
+    assert merged["PainLevel"] == 4
+
+
+def test_merge_maps_tally_user_onto_jotform_user(tmp_path):
+    tally_file = tmp_path / "tally.bts"
+    jotform_file = tmp_path / "jotform.bts"
+    output_file = tmp_path / "merged.bts"
+
+    with StagingWriter(str(tally_file), "tally") as writer:
+        writer.add(make_record("tally", 10, 0, user_id=TALLY_USER_ID, pain_level=None))
+    with StagingWriter(str(jotform_file), "jotform") as writer:
+        writer.add(make_record("jotform", 10, 1, pain_level=3))
+
+    assert merge_staged_sources(
+        [str(tally_file), str(jotform_file)],
+        str(output_file),
+        ["tally", "jotform", "onenote"],
+        2,
+        {TALLY_USER_ID: USER_ID},
+    )
+
+    with StagingFile(str(output_file)) as merged:
+        records = list(merged)
+
+    assert len(records) == 1
+    assert records[0]["UserId"] == USER_ID
+    assert records[0]["Notes"] == "tally"
+    assert records[0]["PainLevel"] == 3
@@ -0,0 +1,113 @@
+import struct
+from datetime import datetime
+
+import pytest
+
+from tracking_log_staging import HEADER, RECORD, StagingFile, StagingFormatError, StagingWriter
+
+
+USER_ID = "688E6E82-75F3-451F-8A0B-40176C70F7F8"
+RECORD_ID = "0F5C2E47-9A1B-4C3D-8E2F-1A2B3C4D5E6F"
+
+
+def make_record(notes="note", event_date=datetime(2025, 3, 1, 10, 0), pain_level=2):
+    return {
+        "Id": RECORD_ID,
+        "UserId": USER_ID,
+        "EventDate": event_date,
+        "Accident": True,
+        "ChangePadOrUnderware": False,
+        "LeakAmount": 2,
+        "Urgency": 3,
+        "AwokeFromSleep": True,
+        "PainLevel": pain_level,
+        "Notes": notes,
+    }
+
+
+def write_staging(path, records, source="onenote"):
+    with StagingWriter(str(path), source) as writer:
+        for record in records:
+            writer.add(record)
+    return path
+
+
+def read_staging(path):
+    with StagingFile(str(path)) as staging:
+        return staging.source, list(staging)
+
+
+def test_header_is_64_bytes():
+    assert HEADER.size == 64
+    assert RECORD.size == 64
+
+
+def test_round_trip(tmp_path):
+    record = make_record()
+    path = write_staging(tmp_path / "staged.bts", [record])
+
+    assert read_staging(path) == ("onenote", [record])
+
+
+def test_null_and_empty_notes_stay_distinct(tmp_path):
+    path = write_staging(
+        tmp_path / "staged.bts",
+        [make_record(notes=None), make_record(notes=""), make_record(notes="it's")],
+    )
+
+    _, records = read_staging(path)
+
+    assert [record["Notes"] for record in records] == [None, "", "it's"]
+
+
+def test_null_pain_level_round_trips(tmp_path):
+    path = write_staging(tmp_path / "staged.bts", [make_record(pain_level=None)])
+
+    _, records = read_staging(path)
+
+    assert records[0]["PainLevel"] is None
+
+
+def test_pre_1970_dates_round_trip(tmp_path):
+    event_date = datetime(1969, 12, 31, 23, 59, 30, 250000)
+    path = write_staging(tmp_path / "staged.bts", [make_record(event_date=event_date)])
+
+    _, records = read_staging(path)
+
+    assert records[0]["EventDate"] == event_date
+
+
+def test_checksum_mismatch_is_rejected(tmp_path):
+    path = write_staging(tmp_path / "staged.bts", [make_record()])
+    data = bytearray(path.read_bytes())
+    data[HEADER.size + 40] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(StagingFormatError, match="checksum"):
+        StagingFile(str(path))
+
+
+def test_truncated_file_is_rejected(tmp_path):
+    path = write_staging(tmp_path / "staged.bts", [make_record(), make_record()])
+    path.write_bytes(path.read_bytes()[:-1])
+
+    with pytest.raises(StagingFormatError, match="truncated"):
+        StagingFile(str(path))
+
+
+def test_file_shorter_than_header_is_rejected(tmp_path):
+    path = tmp_path / "staged.bts"
+    path.write_bytes(b"BTSTAGE\x00")
+
+    with pytest.raises(StagingFormatError, match="too small"):
+        StagingFile(str(path))
+
+
+def test_version_mismatch_is_rejected(tmp_path):
+    path = write_staging(tmp_path / "staged.bts", [make_record()])
+    data = bytearray(path.read_bytes())
+    struct.pack_into("<H", data, 8, 1)
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(StagingFormatError, match="unsupported version 1"):
+        StagingFile(str(path))
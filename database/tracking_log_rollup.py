@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+
+
+# SQL Server has a 1000 row limit for VALUES clauses
+MAX_ROWS_PER_STATEMENT = 1000
+
+# Columns that hold the aggregated values, and how each is computed from
+# [TrackingLog]. PainLevel is NOT NULL there, so EventCount is also the number
+# of pain levels and the mean is PainLevelSum / EventCount.
+AGGREGATES = [
+    ("EventCount", "COUNT(*)"),
+    ("AccidentCount", "SUM(CAST([Accident] AS int))"),
+    ("LeakAmountSum", "SUM([LeakAmount])"),
+    ("LeakAmountMax", "MAX([LeakAmount])"),
+    ("UrgencySum", "SUM([Urgency])"),
+    ("UrgencyMax", "MAX([Urgency])"),
+    ("PainLevelSum", "SUM([PainLevel])"),
+    ("PainLevelMax", "MAX([PainLevel])"),
+    ("AwokeFromSleepCount", "SUM(CAST([AwokeFromSleep] AS int))"),
+]
+
+EVENT_DAY_SQL = "CAST([EventDate] AS date)"
+
+# Monday of the EventDate's week whatever DATEFIRST is; 1900-01-01 was a Monday
+WEEK_START_SQL = (
+    "DATEADD(week, DATEDIFF(day, '19000101', CAST([EventDate] AS date)) / 7, "
+    "CAST('19000101' AS date))"
+)
+
+
+def week_start(event_date):
+    """Return the Monday (ISO week start) of the week containing event_date"""
+    day = event_date.date() if isinstance(event_date, datetime) else event_date
+    return day - timedelta(days=day.weekday())
+
+
+def coerce_int(value):
+    """
+    Convert an imported value to int the way SQL Server does when the generated
+    INSERT puts it in an int column (e.g. a Tally pain level of "2.5" -> 2).
+    Returns None for NULL or anything that isn't a finite number.
+    """
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return int(value)
+    try:
+        return int(float(str(value).strip()))
+    except (ValueError, OverflowError):
+        return None
+
+
+class TrackingLogRollup:
+    """
+    Tracks which per-user days and weeks an import touched.
+
+    The importers call add() for every row they write to an INSERT batch, and
+    write_upsert_script() once at the end. The generated script, run after the
+    INSERT script(s), recomputes just those days/weeks from [TrackingLog] and
+    replaces them in [TrackingLogDailyRollup] and [TrackingLogWeeklyRollup]
+    (see create_rollup_tables.sql). Because it reads what actually landed in
+    TrackingLog, re-running it is harmless and rows the database rejected are
+    never counted.
+    """
+
+    def __init__(self):
+        self.days = set()
+        self.weeks = set()
+
+    def add(self, user_id, event_date):
+        """Mark the day and week of one imported row as needing a recompute"""
+        day = event_date.date() if isinstance(event_date, datetime) else event_date
+        user_id = str(user_id).upper()
+
+        self.days.add((user_id, day))
+        self.weeks.add((user_id, week_start(day)))
+
+    def __len__(self):
+        return len(self.days) + len(self.weeks)
+
+    def write_upsert_script(self, output_filename):
+        """Write the recompute script for the touched days/weeks to output_filename"""
+        with open(output_filename, "w", encoding="utf-8") as outfile:
+            outfile.write("SET XACT_ABORT ON;\nBEGIN TRANSACTION;\n\n")
+            _write_recompute(
+                outfile, "TrackingLogDailyRollup", "EventDay", EVENT_DAY_SQL, self.days
+            )
+            _write_recompute(
+                outfile, "TrackingLogWeeklyRollup", "WeekStart", WEEK_START_SQL, self.weeks
+            )
+            outfile.write("COMMIT TRANSACTION;\n")
+
+        print(
+            f"Created {output_filename} recomputing {len(self.days)} daily "
+            f"and {len(self.weeks)} weekly rollup rows"
+        )
+
+
+def _write_recompute(outfile, table_name, period_column, period_sql, keys):
+    keys = sorted(keys)
+    keys_table = f"#{table_name}Keys"
+
+    outfile.write(
+        f"CREATE TABLE {keys_table} ([UserId] uniqueidentifier NOT NULL, "
+        f"[{period_column}] date NOT NULL);\n"
+    )
+
+    for start in range(0, len(keys), MAX_ROWS_PER_STATEMENT):
+        batch = keys[start : start + MAX_ROWS_PER_STATEMENT]
+        outfile.write(f"INSERT INTO {keys_table} ([UserId], [{period_column}]) VALUES\n")
+        outfile.write(
+            ",\n".join(
+                f"('{user_id}', '{period.strftime('%Y-%m-%d')}')" for user_id, period in batch
+            )
+        )
+        outfile.write(";\n")
+
+    aggregate_columns = ", ".join(f"[{name}]" for name, _ in AGGREGATES)
+    aggregate_selects = ",\n       ".join(sql for _, sql in AGGREGATES)
+    period_sql_t = period_sql.replace("[EventDate]", "t.[EventDate]")
+
+    # Delete then re-insert, so keys with no TrackingLog rows left disappear
+    outfile.write(
+        f"""
+DELETE r
+FROM [{table_name}] AS r
+JOIN {keys_table} AS k
+  ON r.[UserId] = k.[UserId] AND r.[{period_column}] = k.[{period_column}];
+
+INSERT INTO [{table_name}] ([UserId], [{period_column}], {aggregate_columns})
+SELECT t.[UserId], {period_sql_t},
+       {aggregate_selects}
+FROM [TrackingLog] AS t
+JOIN {keys_table} AS k
+  ON t.[UserId] = k.[UserId] AND {period_sql_t} = k.[{period_column}]
+GROUP BY t.[UserId], {period_sql_t};
+
+DROP TABLE {keys_table};
+
+"""
+    )
+
+
+def rollup_output_filename(sql_output_filename):
+    """Companion rollup script name for an importer's SQL output file"""
+    return sql_output_filename.rsplit(".", 1)[0] + "_rollup.sql"
@@ -0,0 +1,244 @@
+import os
+import mmap
+import uuid
+import zlib
+import struct
+from datetime import datetime, timedelta
+
+from tracking_log_rollup import coerce_int
+
+
+# Binary staging file for normalized TrackingLog rows, so an import can be
+# re-run against a fresh database without re-parsing the original CSV/OneNote
+# sources.
+#
+# Layout (little endian):
+#   header   64 bytes (see HEADER)
+#   records  record_count fixed-width records (see RECORD)
+#   notes    UTF-8 bytes of all Notes, referenced by (offset, length)
+#
+# The CRC32 in the header covers everything after the header.
+
+MAGIC = b"BTSTAGE\x00"
+VERSION = 3
+
+# magic, version, record size, source name, record count, notes size, crc32
+HEADER = struct.Struct("<8sHH16sQQI16x")
+
+# Id, UserId, EventDate (microseconds since 1970-01-01, local time as stored),
+# LeakAmount, Urgency, PainLevel, Accident, ChangePadOrUnderware,
+# AwokeFromSleep, notes offset, notes length
+RECORD = struct.Struct("<16s16sqiiiBBBIIx")
+
+EPOCH = datetime(1970, 1, 1)
+NULL_ID = bytes(16)
+NULL_PAIN_LEVEL = -(2 ** 31)
+NULL_NOTES_LENGTH = 0xFFFFFFFF
+
+class StagingFormatError(Exception):
+    pass
+
+
+def _to_uuid_bytes(value):
+    if not value:
+        return NULL_ID
+    return uuid.UUID(str(value)).bytes
+
+
+def _from_uuid_bytes(value):
+    if value == NULL_ID:
+        return None
+    return str(uuid.UUID(bytes=bytes(value))).upper()
+
+
+class StagingWriter:
+    """
+    Streams normalized TrackingLog records into a staging file.
+
+    Records are dicts keyed by TrackingLog column name (the same shape
+    OneNoteExtractor.parse_page_content produces), with EventDate as a
+    datetime. Use as a context manager; the header is written on close.
+    """
+
+    def __init__(self, filename, source=""):
+        self.filename = filename
+        self.source = source.encode("utf-8")[:16]
+        self.record_count = 0
+        self.notes = bytearray()
+        self.crc = 0
+        self.outfile = None
+
+    def __enter__(self):
+        self.outfile = open(self.filename, "wb")
+        # Placeholder, rewritten once the counts and checksum are known
+        self.outfile.write(bytes(HEADER.size))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self._finish()
+        finally:
+            self.outfile.close()
+
+        if exc_type is not None:
+            os.remove(self.filename)
+
+    def add(self, record):
+        """Append one record; raises (and writes nothing) if it can't be packed"""
+        notes = record.get("Notes")
+        if notes is None:
+            encoded = b""
+            notes_offset, notes_length = 0, NULL_NOTES_LENGTH
+        else:
+            encoded = notes.encode("utf-8")
+            notes_offset, notes_length = len(self.notes), len(encoded)
+
+        # Same int conversion the generated SQL gets, e.g. a Tally "2.5"
+        pain_level = coerce_int(record.get("PainLevel"))
+        if pain_level is None:
+            pain_level = NULL_PAIN_LEVEL
+
+        packed = RECORD.pack(
+            _to_uuid_bytes(record.get("Id")),
+            _to_uuid_bytes(record["UserId"]),
+            (record["EventDate"] - EPOCH) // timedelta(microseconds=1),
+            int(record.get("LeakAmount", 1)),
+            int(record.get("Urgency", 1)),
+            pain_level,
+            1 if record.get("Accident") else 0,
+            1 if record.get("ChangePadOrUnderware") else 0,
+            1 if record.get("AwokeFromSleep") else 0,
+            notes_offset,
+            notes_length,
+        )
+        self.notes += encoded
+        self.crc = zlib.crc32(packed, self.crc)
+        self.outfile.write(packed)
+        self.record_count += 1
+
+    def _finish(self):
+        self.crc = zlib.crc32(self.notes, self.crc)
+        self.outfile.write(self.notes)
+        self.outfile.seek(0)
+        self.outfile.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                RECORD.size,
+                self.source,
+                self.record_count,
+                len(self.notes),
+                self.crc,
+            )
+        )
+
+
+class StagingFile:
+    """
+    Memory-mapped, read-only view of a staging file.
+
+    Records are unpacked straight out of the mapping as they are iterated,
+    nothing is parsed or copied up front.
+    """
+
+    def __init__(self, filename, verify_checksum=True):
+        self.filename = filename
+        if os.path.getsize(filename) < HEADER.size:
+            raise StagingFormatError(f"'{filename}' is too small to be a staging file")
+
+        with open(filename, "rb") as infile:
+            self._mmap = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        try:
+            self._read_header(verify_checksum)
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self, verify_checksum):
+        (
+            magic,
+            version,
+            record_size,
+            source,
+            self.record_count,
+            notes_size,
+            crc,
+        ) = HEADER.unpack_from(self._view, 0)
+
+        if magic != MAGIC:
+            raise StagingFormatError(f"'{self.filename}' is not a staging file")
+        if version != VERSION or record_size != RECORD.size:
+            raise StagingFormatError(
+                f"'{self.filename}' has unsupported version {version} "
+                f"(record size {record_size})"
+            )
+
+        self.source = source.rstrip(b"\x00").decode("utf-8")
+
+        records_end = HEADER.size + self.record_count * RECORD.size
+        if len(self._view) != records_end + notes_size:
+            raise StagingFormatError(f"'{self.filename}' does not match its header (truncated?)")
+
+        self._records = self._view[HEADER.size:records_end]
+        self._notes = self._view[records_end:]
+
+        if verify_checksum and zlib.crc32(self._view[HEADER.size:]) != crc:
+            raise StagingFormatError(f"'{self.filename}' failed its checksum")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.record_count
+
+    def close(self):
+        # Sub-views have to be released before the mapping can be closed. A
+        # partly consumed iterator still holds an export of _records; in that
+        # case leave the views and mapping for garbage collection to free.
+        try:
+            for name in ("_records", "_notes", "_view"):
+                view = getattr(self, name, None)
+                if view is not None:
+                    view.release()
+                    setattr(self, name, None)
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __iter__(self):
+        for (
+            record_id,
+            user_id,
+            event_micros,
+            leak_amount,
+            urgency,
+            pain_level,
+            accident,
+            change_pad,
+            awoke_from_sleep,
+            notes_offset,
+            notes_length,
+        ) in RECORD.iter_unpack(self._records):
+            if notes_length == NULL_NOTES_LENGTH:
+                notes = None
+            else:
+                notes = str(self._notes[notes_offset:notes_offset + notes_length], "utf-8")
+
+            yield {
+                "Id": _from_uuid_bytes(record_id),
+                "UserId": _from_uuid_bytes(user_id),
+                "EventDate": EPOCH + timedelta(microseconds=event_micros),
+                "Accident": bool(accident),
+                "ChangePadOrUnderware": bool(change_pad),
+                "LeakAmount": leak_amount,
+                "Urgency": urgency,
+                "AwokeFromSleep": bool(awoke_from_sleep),
+                "PainLevel": None if pain_level == NULL_PAIN_LEVEL else pain_level,
+                "Notes": notes,
+            }